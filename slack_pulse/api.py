@@ -2,14 +2,17 @@
 
 from __future__ import annotations
 
+import asyncio
 from datetime import date, datetime, timezone
 from typing import Optional
 
-from fastapi import Depends, FastAPI, Header, HTTPException, status
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Response, status
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
 from .config import Settings, load_settings
 from .db import Database
-from .service import SlackPulseService
+from .service import PERIODIC_SYNC_DAYS, SlackPulseService, parse_day, run_periodic_sync
 from .slack_client import SlackClient
 
 
@@ -18,6 +21,8 @@ def create_app(settings: Optional[Settings] = None) -> FastAPI:
     database = Database(settings.database_path)
     slack_client = SlackClient(settings.slack_bot_token)
     service = SlackPulseService(settings, database, slack_client)
+    sync_lock = asyncio.Lock()
+    background_tasks: set[asyncio.Task[None]] = set()
 
     async def verify_api_key(x_api_key: str = Header(..., alias="X-API-Key")) -> None:
         if x_api_key != settings.api_key:
@@ -27,19 +32,49 @@ def create_app(settings: Optional[Settings] = None) -> FastAPI:
         if not value:
             return datetime.now(timezone.utc).date()
         try:
-            return datetime.strptime(value, "%Y-%m-%d").date()
+            return parse_day(value)
         except ValueError as exc:
             raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD") from exc
 
-    app = FastAPI(title="Slack Pulse API", version="1.0.0")
+    def requested_day(
+        date_param: Optional[str] = None,
+        legacy_date: Optional[str] = Query(None, alias="date"),
+    ) -> date:
+        # `date` is the parameter name the original server.py endpoints used.
+        return date_dependency(date_param or legacy_date)
+
+    app = FastAPI(
+        title="Slack Pulse API",
+        version="1.0.0",
+        default_response_class=ORJSONResponse,
+    )
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    async def sync_now() -> None:
+        async with sync_lock:
+            await service.sync_recent(PERIODIC_SYNC_DAYS)
+            database.optimize()
 
     @app.on_event("startup")
     async def startup_event() -> None:  # pragma: no cover - io bound
-        await service.sync_recent(1)
+        background_tasks.add(
+            asyncio.create_task(run_periodic_sync(sync_now, settings.sync_interval_seconds))
+        )
 
     @app.on_event("shutdown")
     async def shutdown_event() -> None:  # pragma: no cover - io bound
-        await slack_client.close()
+        for task in background_tasks:
+            task.cancel()
+        # Wait for a shielded in-flight sync before closing its HTTP client.
+        async with sync_lock:
+            await slack_client.close()
+            database.close()
 
     def get_service() -> SlackPulseService:
         return service
@@ -58,21 +93,19 @@ def create_app(settings: Optional[Settings] = None) -> FastAPI:
 
     @app.get("/api/absentees")
     async def get_absentees(
-        date_param: Optional[str] = None,
+        day: date = Depends(requested_day),
         _: None = Depends(verify_api_key),
         svc: SlackPulseService = Depends(get_service),
     ) -> dict[str, object]:
-        day = date_dependency(date_param)
         return {"date": day.isoformat(), "absentees": svc.get_absentees(day)}
 
     @app.get("/api/checkin")
     async def get_checkin(
         user: str,
-        date_param: Optional[str] = None,
+        day: date = Depends(requested_day),
         _: None = Depends(verify_api_key),
         svc: SlackPulseService = Depends(get_service),
     ) -> dict[str, object]:
-        day = date_dependency(date_param)
         checkin = svc.get_user_checkin(user, day)
         if not checkin:
             raise HTTPException(status_code=404, detail="check-in not found")
@@ -80,31 +113,33 @@ def create_app(settings: Optional[Settings] = None) -> FastAPI:
 
     @app.get("/api/summary/day")
     async def get_day_summary(
-        date_param: Optional[str] = None,
+        day: date = Depends(requested_day),
         _: None = Depends(verify_api_key),
         svc: SlackPulseService = Depends(get_service),
     ) -> dict[str, object]:
-        day = date_dependency(date_param)
         return svc.get_daily_summary(day)
 
     @app.get("/api/summary/week")
     async def get_week_summary(
-        date_param: Optional[str] = None,
+        day: date = Depends(requested_day),
         _: None = Depends(verify_api_key),
         svc: SlackPulseService = Depends(get_service),
     ) -> dict[str, object]:
-        day = date_dependency(date_param)
         return svc.get_weekly_summary(day)
 
     @app.get("/api/summary/month")
     async def get_month_summary(
-        date_param: Optional[str] = None,
+        day: date = Depends(requested_day),
         _: None = Depends(verify_api_key),
         svc: SlackPulseService = Depends(get_service),
     ) -> dict[str, object]:
-        day = date_dependency(date_param)
         return svc.get_monthly_summary(day)
 
+    @app.post("/api/refresh")
+    async def refresh(_: None = Depends(verify_api_key)) -> Response:
+        await sync_now()
+        return Response(status_code=status.HTTP_204_NO_CONTENT)
+
     return app
 
 
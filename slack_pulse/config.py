@@ -21,6 +21,7 @@ class Settings:
     team_roster_path: Path
     slack_oldest_ts: Optional[str] = None
     slack_latest_ts: Optional[str] = None
+    sync_interval_seconds: int = 300
 
 
 def load_settings(env_file: str | None = None) -> Settings:
@@ -31,7 +32,9 @@ def load_settings(env_file: str | None = None) -> Settings:
     else:
         load_dotenv()
 
-    db_path = Path(os.getenv("DATABASE_PATH", "slack_pulse.db")).expanduser()
+    db_path = Path(
+        os.getenv("DATABASE_PATH") or os.getenv("DATABASE_URL", "slack_pulse.db")
+    ).expanduser()
     roster_path = Path(
         os.getenv("TEAM_ROSTER_PATH", "team_roster.csv")
     ).expanduser()
@@ -55,6 +58,7 @@ def load_settings(env_file: str | None = None) -> Settings:
         team_roster_path=roster_path,
         slack_oldest_ts=os.getenv("SLACK_OLDEST_TS"),
         slack_latest_ts=os.getenv("SLACK_LATEST_TS"),
+        sync_interval_seconds=int(os.getenv("SYNC_INTERVAL_SECONDS", "300")),
     )
 
 
@@ -3,14 +3,68 @@
 from __future__ import annotations
 
 import sqlite3
-from collections.abc import Iterable
-from contextlib import contextmanager
+import threading
+from collections.abc import Callable, Iterable
+from contextlib import contextmanager, suppress
 from datetime import date
 from pathlib import Path
-from typing import Any, Dict, Iterator, List
+from typing import Any, Dict, Iterator, List, Optional, TypeVar
+
+from .quality import assess_quality
 
 Connection = sqlite3.Connection
 Row = sqlite3.Row
+T = TypeVar("T")
+
+# Applied once to the long-lived connection: WAL with synchronous=NORMAL drops
+# the per-commit fsync, the rest keep temp data and recently read pages in memory.
+# analysis_limit bounds the rows ANALYZE and PRAGMA optimize sample per index.
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-20000",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA analysis_limit=1000",
+)
+STATEMENT_CACHE_SIZE = 256
+
+# Kept as module constants so each bulk writer reuses one cached statement.
+UPSERT_USER_SQL = """
+    INSERT INTO users (id, username, real_name, email, title, updated_at)
+    VALUES (:id, :username, :real_name, :email, :title, :updated_at)
+    ON CONFLICT(id) DO UPDATE SET
+        username=excluded.username,
+        real_name=excluded.real_name,
+        email=excluded.email,
+        title=excluded.title,
+        updated_at=excluded.updated_at
+"""
+# Check-ins are written as positional tuples in this column order, which binds
+# faster than named parameters and spares the sync loop a dict per message.
+CHECKIN_COLUMNS = ("user_id", "username", "ts", "date", "content", "quality")
+UPSERT_CHECKIN_SQL = """
+    INSERT INTO checkins (user_id, username, ts, date, content, quality)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT(user_id, date) DO UPDATE SET
+        ts=excluded.ts,
+        content=excluded.content,
+        quality=excluded.quality,
+        username=excluded.username
+"""
+
+
+# Tables written by the pre-package server.py. Its checkins table stored `text`
+# and no `date`; databases in that shape are converted on first open.
+LEGACY_TABLES = ("users", "checkins", "absentees", "sync_state", "checkins_daily")
+
+
+def _rows_to_dicts(cursor: sqlite3.Cursor) -> List[Dict[str, Any]]:
+    # Read the column names once per query and zip them with plain tuples, so
+    # no sqlite3.Row is built per row on the way to the dict.
+    cursor.row_factory = None
+    columns = [column[0] for column in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor]
 
 
 class Database:
@@ -19,20 +73,75 @@ class Database:
     def __init__(self, path: Path) -> None:
         self._path = path
         self._path.parent.mkdir(parents=True, exist_ok=True)
+        # One connection for the lifetime of the instance keeps compiled
+        # statements cached. The lock serialises its use across FastAPI/MCP
+        # threads: writes and transactions hold it throughout, and reads hold it
+        # until their rows are fetched (see _query).
+        self._lock = threading.RLock()
+        self._transaction_depth = 0
+        self._conn = sqlite3.connect(
+            self._path,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE,
+        )
+        self._conn.row_factory = sqlite3.Row
+        for pragma in PRAGMAS:
+            self._conn.execute(pragma)
         self._initialize()
 
+    def optimize(self) -> None:
+        """Refresh planner statistics that have gone stale as the tables grew."""
+        self._execute("PRAGMA optimize")
+
+    def close(self) -> None:
+        with self._lock:
+            self.optimize()
+            self._conn.close()
+
+    def _execute(self, sql: str, params: Any = ()) -> sqlite3.Cursor:
+        with self._lock:
+            return self._conn.execute(sql, params)
+
+    def _query(self, sql: str, params: Any, read: Callable[[sqlite3.Cursor], T]) -> T:
+        # Step the cursor under the lock too, so a read never interleaves with
+        # another thread's open transaction on the shared connection.
+        with self._lock:
+            return read(self._conn.execute(sql, params))
+
     @contextmanager
-    def connect(self) -> Iterator[Connection]:
-        conn = sqlite3.connect(self._path)
-        conn.row_factory = sqlite3.Row
-        try:
-            yield conn
-        finally:
-            conn.close()
+    def transaction(self) -> Iterator[Connection]:
+        """Run the enclosed statements in one transaction, joining an outer one if open."""
+        with self._lock:
+            # Only the thread holding the lock touches the depth, so a nested
+            # call joins a transaction this thread opened and nothing else.
+            if self._transaction_depth:
+                self._transaction_depth += 1
+                try:
+                    yield self._conn
+                finally:
+                    self._transaction_depth -= 1
+                return
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._transaction_depth = 1
+            try:
+                yield self._conn
+                self._conn.execute("COMMIT")
+            except BaseException:
+                # Also covers a failed COMMIT (e.g. SQLITE_BUSY), which would
+                # otherwise leave the transaction open for every later caller.
+                # A failing ROLLBACK must not mask the original error.
+                if self._conn.in_transaction:
+                    with suppress(sqlite3.Error):
+                        self._conn.execute("ROLLBACK")
+                raise
+            finally:
+                self._transaction_depth = 0
 
     def _initialize(self) -> None:
-        with self.connect() as conn:
+        with self.transaction() as conn:
             cursor = conn.cursor()
+            legacy = self._stash_legacy_tables(cursor)
             cursor.execute(
                 """
                 CREATE TABLE IF NOT EXISTS users (
@@ -73,194 +182,240 @@ class Database:
                 )
                 """
             )
-            conn.commit()
-
-    # region Users
-    def upsert_user(self, user: Dict[str, Any]) -> None:
-        with self.connect() as conn:
-            conn.execute(
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS sync_state (
+                    date TEXT PRIMARY KEY,
+                    last_synced_at TEXT NOT NULL,
+                    message_count INTEGER NOT NULL
+                )
                 """
-                INSERT INTO users (id, username, real_name, email, title, updated_at)
-                VALUES (:id, :username, :real_name, :email, :title, :updated_at)
-                ON CONFLICT(id) DO UPDATE SET
-                    username=excluded.username,
-                    real_name=excluded.real_name,
-                    email=excluded.email,
-                    title=excluded.title,
-                    updated_at=excluded.updated_at
-                """,
-                user,
             )
-            conn.commit()
+            if legacy:
+                self._import_legacy_tables(cursor)
+            # Check-ins already store their UTC day in `date`; index it with the
+            # quality label so daily and monthly rollups never touch the table.
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_checkins_date_quality ON checkins(date, quality)"
+            )
+            # UNIQUE(user_id, date) already indexes per-user lookups. Refresh
+            # planner statistics so the aggregates keep choosing the indexes.
+            cursor.execute("ANALYZE")
+
+    @staticmethod
+    def _stash_legacy_tables(cursor: sqlite3.Cursor) -> bool:
+        columns = {row[1] for row in cursor.execute("PRAGMA table_info(checkins)")}
+        if "text" not in columns or "date" in columns:
+            return False
+        existing = {
+            row[0] for row in cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+        }
+        for table in LEGACY_TABLES:
+            if table in existing:
+                cursor.execute(f"ALTER TABLE {table} RENAME TO legacy_{table}")
+        return True
+
+    @staticmethod
+    def _import_legacy_tables(cursor: sqlite3.Cursor) -> None:
+        cursor.execute(
+            """
+            INSERT INTO users (id, username, real_name, email)
+            SELECT id, COALESCE(name, id), real_name, email
+            FROM legacy_users
+            WHERE COALESCE(is_bot, 0) = 0
+            """
+        )
+        # The legacy table kept every message; keep each user's latest per day,
+        # re-scored with the current rules (and the same stripping as sync_day)
+        # so imported labels match freshly synced ones.
+        cursor.connection.create_function(
+            "assess_quality_label", 1, lambda text: assess_quality(text.strip()).label, deterministic=True
+        )
+        cursor.execute(
+            """
+            INSERT OR REPLACE INTO checkins (user_id, username, ts, date, content, quality, created_at)
+            SELECT user_id, username, ts, date(ts, 'unixepoch'), text,
+                   assess_quality_label(COALESCE(text, '')), created_at
+            FROM legacy_checkins
+            ORDER BY ts
+            """
+        )
+        cursor.connection.create_function("assess_quality_label", 1, None)
+        cursor.execute(
+            "INSERT OR IGNORE INTO absentees (user_id, date) SELECT user_id, date FROM legacy_absentees"
+        )
+        # Legacy sync progress (a single latest_ts) and the roll-up have no
+        # counterpart; past days are simply re-synced when next requested.
+        for table in LEGACY_TABLES:
+            cursor.execute(f"DROP TABLE IF EXISTS legacy_{table}")
+
+    # region Users
+    def upsert_users_bulk(self, users: Iterable[Dict[str, Any]]) -> None:
+        with self.transaction() as conn:
+            conn.executemany(UPSERT_USER_SQL, users)
 
     def get_users(self) -> List[Row]:
-        with self.connect() as conn:
-            cursor = conn.execute("SELECT * FROM users ORDER BY real_name")
-            return cursor.fetchall()
+        return self._query("SELECT * FROM users ORDER BY real_name", (), sqlite3.Cursor.fetchall)
 
     # endregion
 
     # region Check-ins
-    def record_checkin(self, record: Dict[str, Any]) -> None:
-        with self.connect() as conn:
-            conn.execute(
-                """
-                INSERT INTO checkins (user_id, username, ts, date, content, quality)
-                VALUES (:user_id, :username, :ts, :date, :content, :quality)
-                ON CONFLICT(user_id, date) DO UPDATE SET
-                    ts=excluded.ts,
-                    content=excluded.content,
-                    quality=excluded.quality,
-                    username=excluded.username
-                """,
-                record,
-            )
-            conn.commit()
+    def record_checkins_bulk(self, records: Iterable[tuple[Any, ...]]) -> None:
+        """Upsert check-ins given as tuples in ``CHECKIN_COLUMNS`` order."""
+        with self.transaction() as conn:
+            conn.executemany(UPSERT_CHECKIN_SQL, records)
 
-    def get_checkins_by_date(self, day: date) -> List[Row]:
-        with self.connect() as conn:
-            cursor = conn.execute(
-                "SELECT * FROM checkins WHERE date = ? ORDER BY ts",
-                (day.isoformat(),),
-            )
-            return cursor.fetchall()
+    def get_checkins_by_date_as_dicts(self, day: date) -> List[Dict[str, Any]]:
+        return self._query(
+            "SELECT * FROM checkins WHERE date = ? ORDER BY ts",
+            (day.isoformat(),),
+            _rows_to_dicts,
+        )
 
-    def get_checkin_for_user(self, user_id: str, day: date) -> Optional[Row]:
-        with self.connect() as conn:
-            cursor = conn.execute(
-                "SELECT * FROM checkins WHERE user_id = ? AND date = ?",
-                (user_id, day.isoformat()),
-            )
-            return cursor.fetchone()
+    def get_usernames_for_date(self, day: date) -> Dict[str, str]:
+        return self._query(
+            "SELECT user_id, username FROM checkins WHERE date = ?",
+            (day.isoformat(),),
+            lambda cursor: {row[0]: row[1] for row in cursor},
+        )
+
+    def get_checkin_for_user(self, user_id: str, day: date) -> Optional[Dict[str, Any]]:
+        rows = self._query(
+            "SELECT * FROM checkins WHERE user_id = ? AND date = ?",
+            (user_id, day.isoformat()),
+            _rows_to_dicts,
+        )
+        return rows[0] if rows else None
+
+    def _quality_totals(self, start_day: date, end_day: date) -> Row:
+        return self._query(
+            """
+            SELECT COUNT(*) as total,
+                   COALESCE(SUM(CASE WHEN quality = 'good' THEN 1 ELSE 0 END), 0) as good,
+                   COALESCE(
+                       ROUND(100.0 * SUM(CASE WHEN quality = 'good' THEN 1 ELSE 0 END)
+                             / NULLIF(COUNT(*), 0), 2),
+                       0
+                   ) as good_percentage
+            FROM checkins
+            WHERE date BETWEEN ? AND ?
+            """,
+            (start_day.isoformat(), end_day.isoformat()),
+            sqlite3.Cursor.fetchone,
+        )
 
     def get_daily_summary(self, day: date) -> Dict[str, Any]:
-        with self.connect() as conn:
-            cursor = conn.execute(
+        row = self._quality_totals(day, day)
+        return {
+            "date": day.isoformat(),
+            "total_checkins": row["total"],
+            "good_checkins": row["good"],
+            "good_percentage": row["good_percentage"],
+        }
+
+    def get_checkin_counts_by_user(
+        self, start_day: date, end_day: date
+    ) -> Dict[str, tuple[int, int, float]]:
+        """Map user id to (check-ins, good check-ins, good percentage)."""
+        return self._query(
+            """
+            SELECT user_id,
+                   COUNT(*) as total,
+                   SUM(CASE WHEN quality = 'good' THEN 1 ELSE 0 END) as good,
+                   ROUND(100.0 * SUM(CASE WHEN quality = 'good' THEN 1 ELSE 0 END)
+                         / NULLIF(COUNT(*), 0), 2) as good_percentage
+            FROM checkins
+            WHERE date BETWEEN ? AND ?
+            GROUP BY user_id
+            """,
+            (start_day.isoformat(), end_day.isoformat()),
+            lambda cursor: {row[0]: (row[1], row[2], row[3]) for row in cursor},
+        )
+
+    def get_monthly_trend(self, start_day: date, end_day: date) -> Dict[str, Any]:
+        trend = self._query(
+            """
+            SELECT date,
+                   COUNT(*) as total,
+                   SUM(CASE WHEN quality = 'good' THEN 1 ELSE 0 END) as good_checkins,
+                   ROUND(100.0 * SUM(CASE WHEN quality = 'good' THEN 1 ELSE 0 END)
+                         / NULLIF(COUNT(*), 0), 2) as good_percentage
+            FROM checkins
+            WHERE date BETWEEN ? AND ?
+            GROUP BY date
+            ORDER BY date
+            """,
+            (start_day.isoformat(), end_day.isoformat()),
+            _rows_to_dicts,
+        )
+        totals = self._quality_totals(start_day, end_day)
+        return {
+            "start": start_day.isoformat(),
+            "end": end_day.isoformat(),
+            "total_checkins": totals["total"],
+            "avg_good_percentage": totals["good_percentage"],
+            "trend": trend,
+        }
+
+    # endregion
+
+    # region Absentees
+    def recompute_absentees(self, day: date) -> None:
+        """Mark every user without a check-in on ``day`` as absent."""
+        day_iso = day.isoformat()
+        with self.transaction() as conn:
+            # Late check-ins clear an earlier absence.
+            conn.execute(
                 """
-                SELECT COUNT(*) as total,
-                       SUM(CASE WHEN quality = 'good' THEN 1 ELSE 0 END) as good
-                FROM checkins
+                DELETE FROM absentees
                 WHERE date = ?
+                  AND user_id IN (SELECT user_id FROM checkins WHERE date = ?)
                 """,
-                (day.isoformat(),),
+                (day_iso, day_iso),
             )
-            row = cursor.fetchone()
-            total = row["total"] if row else 0
-            good = row["good"] if row and row["good"] is not None else 0
-            percent_good = (good / total) * 100 if total else 0
-            return {
-                "date": day.isoformat(),
-                "total_checkins": total,
-                "good_checkins": good,
-                "good_percentage": round(percent_good, 2),
-            }
-
-    def get_weekly_stats(self, start_day: date, end_day: date) -> List[Dict[str, Any]]:
-        with self.connect() as conn:
-            cursor = conn.execute(
+            conn.execute(
                 """
-                SELECT u.id as user_id,
-                       u.real_name,
-                       COUNT(c.id) as total,
-                       SUM(CASE WHEN c.quality = 'good' THEN 1 ELSE 0 END) as good
+                INSERT OR IGNORE INTO absentees (user_id, date)
+                SELECT u.id, ?
                 FROM users u
-                LEFT JOIN checkins c
-                  ON u.id = c.user_id
-                 AND c.date BETWEEN ? AND ?
-                GROUP BY u.id, u.real_name
-                ORDER BY u.real_name
+                WHERE u.id NOT IN (SELECT user_id FROM checkins WHERE date = ?)
+                ORDER BY u.id
                 """,
-                (start_day.isoformat(), end_day.isoformat()),
+                (day_iso, day_iso),
             )
-            results: List[Dict[str, Any]] = []
-            for row in cursor.fetchall():
-                total = row["total"] or 0
-                good = row["good"] or 0
-                percent_good = (good / total) * 100 if total else 0
-                results.append(
-                    {
-                        "user_id": row["user_id"],
-                        "name": row["real_name"],
-                        "checkins": total,
-                        "good_checkins": good,
-                        "good_percentage": round(percent_good, 2),
-                    }
-                )
-            return results
 
-    def get_monthly_trend(self, start_day: date, end_day: date) -> Dict[str, Any]:
-        with self.connect() as conn:
-            cursor = conn.execute(
-                """
-                SELECT date,
-                       COUNT(*) as total,
-                       SUM(CASE WHEN quality = 'good' THEN 1 ELSE 0 END) as good
-                FROM checkins
-                WHERE date BETWEEN ? AND ?
-                GROUP BY date
-                ORDER BY date
-                """,
-                (start_day.isoformat(), end_day.isoformat()),
-            )
-            total_checkins = 0
-            total_good = 0
-            trend: List[Dict[str, Any]] = []
-            for row in cursor.fetchall():
-                day_total = row["total"] or 0
-                day_good = row["good"] or 0
-                total_checkins += day_total
-                total_good += day_good
-                percent_good = (day_good / day_total) * 100 if day_total else 0
-                trend.append(
-                    {
-                        "date": row["date"],
-                        "total": day_total,
-                        "good_checkins": day_good,
-                        "good_percentage": round(percent_good, 2),
-                    }
-                )
-            avg_quality = (total_good / total_checkins) * 100 if total_checkins else 0
-            return {
-                "start": start_day.isoformat(),
-                "end": end_day.isoformat(),
-                "total_checkins": total_checkins,
-                "avg_good_percentage": round(avg_quality, 2),
-                "trend": trend,
-            }
+    def get_absentees(self, day: date) -> List[Dict[str, Any]]:
+        return self._query(
+            """
+            SELECT a.date, u.id as user_id, u.real_name, u.username
+            FROM absentees a
+            JOIN users u ON u.id = a.user_id
+            WHERE a.date = ?
+            ORDER BY u.real_name
+            """,
+            (day.isoformat(),),
+            _rows_to_dicts,
+        )
 
     # endregion
 
-    # region Absentees
-    def record_absentees(self, day: date, user_ids: Iterable[str]) -> None:
-        with self.connect() as conn:
-            conn.executemany(
-                """
-                INSERT INTO absentees (user_id, date)
-                VALUES (?, ?)
-                ON CONFLICT(user_id, date) DO NOTHING
-                """,
-                [(user_id, day.isoformat()) for user_id in user_ids],
-            )
-            conn.commit()
-
-    def clear_absentees(self, day: date) -> None:
-        with self.connect() as conn:
-            conn.execute("DELETE FROM absentees WHERE date = ?", (day.isoformat(),))
-            conn.commit()
+    # region Sync state
+    def set_sync_state(self, day: date, message_count: int) -> None:
+        self._execute(
+            """
+            INSERT INTO sync_state (date, last_synced_at, message_count)
+            VALUES (?, CURRENT_TIMESTAMP, ?)
+            ON CONFLICT(date) DO UPDATE SET
+                last_synced_at=excluded.last_synced_at,
+                message_count=excluded.message_count
+            """,
+            (day.isoformat(), message_count),
+        )
 
-    def get_absentees(self, day: date) -> List[Row]:
-        with self.connect() as conn:
-            cursor = conn.execute(
-                """
-                SELECT a.date, u.id as user_id, u.real_name, u.username
-                FROM absentees a
-                JOIN users u ON u.id = a.user_id
-                WHERE a.date = ?
-                ORDER BY u.real_name
-                """,
-                (day.isoformat(),),
-            )
-            return cursor.fetchall()
+    def get_sync_state(self, day: date) -> Optional[Row]:
+        return self._query(
+            "SELECT * FROM sync_state WHERE date = ?", (day.isoformat(),), sqlite3.Cursor.fetchone
+        )
 
     # endregion
 
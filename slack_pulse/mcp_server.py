@@ -3,82 +3,125 @@
 from __future__ import annotations
 
 import asyncio
-from datetime import datetime, timezone
+import atexit
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timedelta, timezone
 from typing import Optional
 
 from mcp.server.fastmcp import FastMCP
 
 from .config import load_settings
 from .db import Database
-from .service import SlackPulseService
+from .service import (
+    PERIODIC_SYNC_DAYS,
+    SlackPulseService,
+    parse_day,
+    period_bounds,
+    run_periodic_sync,
+)
 from .slack_client import SlackClient
 
-mcp = FastMCP("slack-pulse")
-
 _settings = load_settings()
-_database = Database(_settings.database_path)
-_client = SlackClient(_settings.slack_bot_token)
-_service = SlackPulseService(_settings, _database, _client)
 _sync_lock = asyncio.Lock()
+# Process-wide: built by the first lifespan entry and never torn down by one.
+_service: Optional[SlackPulseService] = None
+_sync_task: Optional[asyncio.Task[None]] = None
+
+async def _sync_for_day(day: Optional[date] = None, force: bool = False) -> None:
+    service = _service
+    async with _sync_lock:
+        await service.sync_day(day or datetime.now(timezone.utc).date(), force=force)
+        service.database.optimize()
+
+
+async def _ensure_synced(day: date, force_sync: bool) -> None:
+    # Tools answer from SQLite, but a day the background window never covered
+    # (or last synced before it closed) would look empty, so sync it first.
+    if force_sync:
+        await _sync_for_day(day, force=True)
+    elif _service.needs_sync(day):
+        await _sync_for_day(day)
 
 
-async def _sync_for_day(day_str: Optional[str] = None) -> None:
-    day = (
-        datetime.strptime(day_str, "%Y-%m-%d").date()
-        if day_str
-        else datetime.now(timezone.utc).date()
-    )
+async def _sync_recent() -> None:
+    service = _service
     async with _sync_lock:
-        await _service.sync_day(day)
+        await service.sync_recent(PERIODIC_SYNC_DAYS)
+        service.database.optimize()
+
+
+@asynccontextmanager
+async def _lifespan(server: FastMCP) -> AsyncIterator[None]:  # pragma: no cover - io bound
+    # FastMCP enters the lifespan once per session, and once per request with
+    # stateless HTTP, so the database, Slack client and sync loop belong to the
+    # process instead: ending a session never waits on or rebuilds them.
+    global _service, _sync_task
+    if _service is None:
+        database = Database(_settings.database_path)
+        _service = SlackPulseService(_settings, database, SlackClient(_settings.slack_bot_token))
+        atexit.register(database.close)
+    if _sync_task is None or _sync_task.done():
+        # Tools read straight from SQLite; this task keeps recent days fresh.
+        _sync_task = asyncio.create_task(
+            run_periodic_sync(_sync_recent, _settings.sync_interval_seconds)
+        )
+    yield
+
+mcp = FastMCP("slack-pulse", lifespan=_lifespan)
 
 
 def _ensure_date(day_str: Optional[str] = None):
     if not day_str:
         return datetime.now(timezone.utc).date()
-    return datetime.strptime(day_str, "%Y-%m-%d").date()
+    return parse_day(day_str)
 
 
 @mcp.tool()
-async def get_daily_checkins() -> dict:
-    """Return today's check-ins."""
+async def get_daily_checkins(force_sync: bool = False) -> dict:
+    """Return today's check-ins, syncing from Slack first if ``force_sync`` is set."""
 
     day = datetime.now(timezone.utc).date()
-    await _sync_for_day(day.isoformat())
+    await _ensure_synced(day, force_sync)
     return {"date": day.isoformat(), "checkins": _service.get_daily_checkins(day)}
 
 
 @mcp.tool()
-async def get_absentees(date: Optional[str] = None) -> dict:
+async def get_absentees(date: Optional[str] = None, force_sync: bool = False) -> dict:
     """Return the list of users who did not submit a check-in for the date."""
 
     day = _ensure_date(date)
-    await _sync_for_day(day.isoformat())
+    await _ensure_synced(day, force_sync)
     return {"date": day.isoformat(), "absentees": _service.get_absentees(day)}
 
 
 @mcp.tool()
-async def get_user_checkin(user_id: str, date: Optional[str] = None) -> dict:
+async def get_user_checkin(
+    user_id: str, date: Optional[str] = None, force_sync: bool = False
+) -> dict:
     """Return a specific user's check-in for the given date."""
 
     day = _ensure_date(date)
-    await _sync_for_day(day.isoformat())
+    await _ensure_synced(day, force_sync)
     checkin = _service.get_user_checkin(user_id, day)
     return {"date": day.isoformat(), "checkin": checkin}
 
 
 @mcp.tool()
-async def get_cumulative_report(period: str = "month") -> dict:
+async def get_cumulative_report(period: str = "month", force_sync: bool = False) -> dict:
     """Return aggregate engagement metrics for the requested period."""
 
     today = datetime.now(timezone.utc).date()
-    await _sync_for_day(today.isoformat())
+    start, end = period_bounds(period, today)
+    day = start
+    while day <= min(end, today):
+        await _ensure_synced(day, force_sync and day == today)
+        day += timedelta(days=1)
     if period == "day":
         return _service.get_daily_summary(today)
     if period == "week":
         return _service.get_weekly_summary(today)
-    if period == "month":
-        return _service.get_monthly_summary(today)
-    raise ValueError("period must be one of: day, week, month")
+    return _service.get_monthly_summary(today)
 
 
 __all__ = [
@@ -15,20 +15,10 @@ class User:
     title: str | None = None
 
 
-@dataclass(slots=True)
-class CheckIn:
-    user_id: str
-    username: str
-    ts: float
-    submitted_date: date
-    content: str
-    quality: str
-
-
 @dataclass(slots=True)
 class Absentee:
     user_id: str
     submitted_date: date
 
 
-__all__ = ["User", "CheckIn", "Absentee"]
+__all__ = ["User", "Absentee"]
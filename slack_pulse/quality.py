@@ -2,11 +2,12 @@
 
 from __future__ import annotations
 
+import functools
 import re
 from dataclasses import dataclass
-from typing import List
+from typing import Iterable, List
 
-KEYWORDS = {"completed", "blocked", "planning", "done", "help", "stuck"}
+KEYWORDS = frozenset({"completed", "blocked", "planning", "done", "help", "stuck"})
 STRUCTURE_PATTERNS = [
     re.compile(r"^[-*]\s", re.MULTILINE),
     re.compile(r"^\d+\.\s", re.MULTILINE),
@@ -14,6 +15,19 @@ STRUCTURE_PATTERNS = [
     re.compile(r"blocked:\s", re.IGNORECASE),
     re.compile(r"planning:\s", re.IGNORECASE),
 ]
+# Single-pass equivalents of the checks above. The alternation keeps each
+# pattern's semantics: the keyword tests run on the lowercased text as plain
+# substrings, and the line-anchored patterns contain no letters for
+# IGNORECASE to affect.
+STRUCTURE_RE = re.compile(
+    "|".join(f"(?:{pattern.pattern})" for pattern in STRUCTURE_PATTERNS),
+    re.MULTILINE | re.IGNORECASE,
+)
+# A plain alternation stops at the first keyword found. The engine still tries
+# each alternative in turn at every position that passes its leading-character
+# filter, but for six short literals that is fast enough without pulling in an
+# Aho-Corasick dependency.
+KEYWORDS_RE = re.compile("|".join(re.escape(keyword) for keyword in sorted(KEYWORDS)))
 
 
 @dataclass(slots=True)
@@ -27,6 +41,39 @@ class QualityResult:
 def assess_quality(message: str) -> QualityResult:
     """Return the quality label for a Slack check-in message."""
 
+    label, reasons = _assess_quality_cached(message)
+    # Fresh list per call so callers cannot mutate the cached reasons.
+    return QualityResult(label=label, reasons=list(reasons))
+
+
+def assess_quality_batch(messages: Iterable[str]) -> List[QualityResult]:
+    """Return quality results for ``messages`` in order."""
+
+    # The patterns are compiled once at import and repeated texts hit the
+    # cache, so a batch is a single tight pass over the messages.
+    return [
+        QualityResult(label=label, reasons=list(reasons))
+        for label, reasons in map(_assess_quality_cached, messages)
+    ]
+
+
+def assess_quality_labels(messages: Iterable[str]) -> List[str]:
+    """Return only the quality label for each of ``messages``, in order."""
+
+    # Callers that store just the label skip building a result per message.
+    return [_assess_quality_cached(message)[0] for message in messages]
+
+
+def clear_quality_cache() -> None:
+    """Forget memoised assessments, e.g. after changing the scoring rules."""
+
+    _assess_quality_cached.cache_clear()
+
+
+@functools.lru_cache(maxsize=4096)
+def _assess_quality_cached(message: str) -> tuple[str, tuple[str, ...]]:
+    # Boilerplate updates repeat day after day, and sync_day re-scores the
+    # whole day on every pass, so most calls are cache hits.
     normalized = message.strip().lower()
     reasons: List[str] = []
 
@@ -34,11 +81,11 @@ def assess_quality(message: str) -> QualityResult:
     if has_length:
         reasons.append("length")
 
-    has_keyword = any(keyword in normalized for keyword in KEYWORDS)
+    has_keyword = KEYWORDS_RE.search(normalized) is not None
     if has_keyword:
         reasons.append("keyword")
 
-    has_structure = any(pattern.search(message) for pattern in STRUCTURE_PATTERNS)
+    has_structure = STRUCTURE_RE.search(message) is not None
     if has_structure:
         reasons.append("structure")
 
@@ -46,7 +93,13 @@ def assess_quality(message: str) -> QualityResult:
     label = "good" if score >= 2 else "bad"
     if not reasons:
         reasons.append("insufficient_detail")
-    return QualityResult(label=label, reasons=reasons)
+    return label, tuple(reasons)
 
 
-__all__ = ["QualityResult", "assess_quality"]
+__all__ = [
+    "QualityResult",
+    "assess_quality",
+    "assess_quality_batch",
+    "assess_quality_labels",
+    "clear_quality_cache",
+]
@@ -2,18 +2,42 @@
 
 from __future__ import annotations
 
+import asyncio
 import csv
-from datetime import date, datetime, time, timedelta, timezone
+import functools
+import logging
+import random
+import time
+from collections.abc import Awaitable, Callable
+from datetime import date, datetime, timedelta, timezone
 from pathlib import Path
 from typing import Any, Dict, Iterable, List, Optional
 
 from .config import Settings
 from .db import Database
-from .models import CheckIn, User
-from .quality import QualityResult, assess_quality
+from .models import User
+from .quality import assess_quality_labels
 from .slack_client import SlackClient
 
 
+logger = logging.getLogger(__name__)
+
+# Rosters change slowly, so a fresh users.list pull is only needed this often.
+ROSTER_SYNC_INTERVAL_SECONDS = 15 * 60
+ROSTER_FIELDS = ("username", "real_name", "email", "title")
+# Failed syncs retry after SYNC_RETRY_BASE_SECONDS, doubling up to the cap.
+SYNC_RETRY_BASE_SECONDS = 30.0
+SYNC_RETRY_MAX_SECONDS = 1800.0
+SYNC_JITTER = 0.1
+# Upper bound on check-in rows held in memory before they are written.
+CHECKIN_FLUSH_SIZE = 500
+# Background syncs cover yesterday as well, so check-ins posted just before UTC
+# midnight and the final absentee list still land; sealing keeps it cheap after.
+PERIODIC_SYNC_DAYS = 2
+SECONDS_PER_DAY = 86400
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
 class SlackPulseService:
     """High-level service that syncs Slack data and exposes query helpers."""
 
@@ -21,20 +45,38 @@ class SlackPulseService:
         self.settings = settings
         self.database = database
         self.client = client
+        # time.monotonic() of the last users.list pull, immune to clock changes
+        self._roster_synced_at: Optional[float] = None
+        self._roster_version = 0
+        # users table as of the last roster sync; another process sharing the
+        # database may change it, so the version follows this, not our writes
+        self._roster_snapshot: Optional[Dict[str, tuple[Any, ...]]] = None
+        # day -> (check-in user ids, roster version) used for its absentee list
+        self._absentee_inputs: Dict[date, tuple[frozenset[str], int]] = {}
+        # (roster version, users sorted by real_name) for the weekly report
+        self._sorted_users: Optional[tuple[int, List[tuple[str, Optional[str]]]]] = None
 
     # region Sync helpers
-    async def sync_roster(self) -> None:
+    async def sync_roster(self, force: bool = False) -> None:
+        if (
+            not force
+            and self._roster_synced_at is not None
+            and time.monotonic() - self._roster_synced_at < ROSTER_SYNC_INTERVAL_SECONDS
+        ):
+            return
+        updated_at = datetime.now(timezone.utc).isoformat()
+        user_rows: List[Dict[str, Any]] = []
         roster_path = self.settings.team_roster_path
         if roster_path.exists():
             for user in load_roster_csv(roster_path):
-                self.database.upsert_user(
+                user_rows.append(
                     {
                         "id": user.id,
                         "username": user.username,
                         "real_name": user.real_name,
                         "email": user.email,
                         "title": user.title,
-                        "updated_at": datetime.utcnow().isoformat(),
+                        "updated_at": updated_at,
                     }
                 )
 
@@ -52,34 +94,61 @@ class SlackPulseService:
                 email=profile.get("email"),
                 title=profile.get("title"),
             )
-            self.database.upsert_user(
+            user_rows.append(
                 {
                     "id": user.id,
                     "username": user.username,
                     "real_name": user.real_name,
                     "email": user.email,
                     "title": user.title,
-                    "updated_at": datetime.utcnow().isoformat(),
+                    "updated_at": updated_at,
                 }
             )
+        # Later sources win for the same id (Slack over the CSV); only rows that
+        # differ from what is stored are written.
+        latest_rows = {row["id"]: row for row in user_rows}
+        stored = {
+            row["id"]: tuple(row[field] for field in ROSTER_FIELDS)
+            for row in self.database.get_users()
+        }
+        changed = [
+            row
+            for user_id, row in latest_rows.items()
+            if stored.get(user_id) != tuple(row[field] for field in ROSTER_FIELDS)
+        ]
+        if changed:
+            self.database.upsert_users_bulk(changed)
+            for row in changed:
+                stored[row["id"]] = tuple(row[field] for field in ROSTER_FIELDS)
+        if stored != self._roster_snapshot:
+            self._roster_snapshot = stored
+            self._roster_version += 1
+        self._roster_synced_at = time.monotonic()
+
+    async def sync_day(self, day: date, force: bool = False) -> None:
+        """Sync one UTC day of check-ins; sealed days already synced are skipped."""
 
-    async def sync_day(self, day: date) -> None:
+        if not force and self._is_synced_and_sealed(day):
+            return
         await self.sync_roster()
         oldest_ts, latest_ts = day_bounds(day)
-        messages: List[Dict[str, Any]] = []
+        # Compare raw epoch seconds against the day's bounds rather than
+        # building an aware datetime per message.
+        day_start, day_end = float(oldest_ts), float(latest_ts)
+        checkin_user_ids: set[str] = set()
+        message_count = 0
+        # (user_id, username, ts, text) awaiting a batched quality pass and write
+        pending: List[tuple[str, str, float, str]] = []
+        # Stored usernames for the day, overridden as this pass sees each user.
+        usernames = self.database.get_usernames_for_date(day)
         async for message in self.client.fetch_channel_history(
             self.settings.channel_id,
             oldest=self.settings.slack_oldest_ts or oldest_ts,
             latest=self.settings.slack_latest_ts or latest_ts,
         ):
             ts = float(message.get("ts", 0))
-            message_day = datetime.fromtimestamp(ts, tz=timezone.utc).date()
-            if message_day != day:
+            if not day_start <= ts < day_end:
                 continue
-            messages.append(message)
-
-        checkin_user_ids: set[str] = set()
-        for message in messages:
             user_id = message.get("user")
             if not user_id:
                 continue
@@ -87,80 +156,161 @@ class SlackPulseService:
             if not text:
                 continue
 
-            quality: QualityResult = assess_quality(text)
             username = message.get("username") or message.get("user_profile", {}).get("name")
             if not username:
-                # fallback to stored username
-                record = self.database.get_checkin_for_user(user_id, day)
-                username = record["username"] if record else user_id
-
-            checkin = CheckIn(
-                user_id=user_id,
-                username=username,
-                ts=float(message.get("ts", 0.0)),
-                submitted_date=day,
-                content=text,
-                quality=quality.label,
-            )
-            self.database.record_checkin(
-                {
-                    "user_id": checkin.user_id,
-                    "username": checkin.username,
-                    "ts": checkin.ts,
-                    "date": checkin.submitted_date.isoformat(),
-                    "content": checkin.content,
-                    "quality": checkin.quality,
-                }
-            )
+                # fallback to an earlier message in this batch, then the stored username
+                username = usernames.get(user_id, user_id)
+            usernames[user_id] = username
+
+            pending.append((user_id, username, ts, text))
             checkin_user_ids.add(user_id)
+            message_count += 1
+            if len(pending) >= CHECKIN_FLUSH_SIZE:
+                self._record_checkins(day, pending)
+                pending = []
+        if pending:
+            self._record_checkins(day, pending)
+
+        # Nothing to rewrite if neither the day's check-ins nor the roster
+        # changed since this day's absentees were last computed.
+        absentee_inputs = (frozenset(checkin_user_ids), self._roster_version)
+        if self._absentee_inputs.get(day) != absentee_inputs:
+            self.database.recompute_absentees(day)
+            self._absentee_inputs[day] = absentee_inputs
+        self.database.set_sync_state(day, message_count)
 
-        roster_ids = {row["id"] for row in self.database.get_users()}
-        missing = sorted(roster_ids - checkin_user_ids)
-        self.database.clear_absentees(day)
-        if missing:
-            self.database.record_absentees(day, missing)
+    def _record_checkins(self, day: date, pending: List[tuple[str, str, float, str]]) -> None:
+        labels = assess_quality_labels([text for *_, text in pending])
+        day_iso = day.isoformat()
+        # Rows go straight to the writer in CHECKIN_COLUMNS order.
+        rows = [
+            (user_id, username, ts, day_iso, text, label)
+            for (user_id, username, ts, text), label in zip(pending, labels)
+        ]
+        self.database.record_checkins_bulk(rows)
+
+    def _is_synced_and_sealed(self, day: date) -> bool:
+        # A day is sealed once the following day has also ended; its history
+        # only counts as complete if the last sync ran after that point too.
+        if not _is_sealed(day, datetime.now(timezone.utc).date()):
+            return False
+        state = self.database.get_sync_state(day)
+        if state is None:
+            return False
+        synced_on = date.fromisoformat(state["last_synced_at"][:10])
+        return _is_sealed(day, synced_on)
+
+    def needs_sync(self, day: date) -> bool:
+        """Return whether ``day`` should be synced before its stored data is served."""
+
+        today = datetime.now(timezone.utc).date()
+        if day > today:
+            return False
+        state = self.database.get_sync_state(day)
+        if state is None:
+            return True
+        # Days in the background window are refreshed on every periodic pass;
+        # older ones only need another pass until a sync has sealed them.
+        if day > today - timedelta(days=PERIODIC_SYNC_DAYS):
+            return False
+        synced_on = date.fromisoformat(state["last_synced_at"][:10])
+        return not _is_sealed(day, synced_on)
 
     async def sync_recent(self, days: int = 1) -> None:
         today = datetime.now(timezone.utc).date()
-        for offset in range(days):
-            await self.sync_day(today - timedelta(days=offset))
+        # Pull the roster up front so the concurrent days do not each fetch it.
+        await self.sync_roster()
+        # A failing day cancels its siblings instead of leaving them running;
+        # callers still see the first error itself rather than a group.
+        try:
+            async with asyncio.TaskGroup() as group:
+                for offset in range(days):
+                    group.create_task(self.sync_day(today - timedelta(days=offset)))
+        except ExceptionGroup as exc:
+            raise exc.exceptions[0] from exc
 
     # endregion
 
     # region Query helpers
     def get_daily_checkins(self, day: date) -> List[Dict[str, Any]]:
-        return [dict(row) for row in self.database.get_checkins_by_date(day)]
+        return self.database.get_checkins_by_date_as_dicts(day)
 
     def get_absentees(self, day: date) -> List[Dict[str, Any]]:
-        return [dict(row) for row in self.database.get_absentees(day)]
+        return self.database.get_absentees(day)
 
     def get_user_checkin(self, user_id: str, day: date) -> Optional[Dict[str, Any]]:
-        row = self.database.get_checkin_for_user(user_id, day)
-        return dict(row) if row else None
+        return self.database.get_checkin_for_user(user_id, day)
 
     def get_daily_summary(self, day: date) -> Dict[str, Any]:
         return self.database.get_daily_summary(day)
 
     def get_weekly_summary(self, day: date) -> Dict[str, Any]:
-        start = day - timedelta(days=day.weekday())
-        end = start + timedelta(days=6)
-        stats = self.database.get_weekly_stats(start, end)
+        start, end = period_bounds("week", day)
+        counts = self.database.get_checkin_counts_by_user(start, end)
+        stats: List[Dict[str, Any]] = []
+        for user_id, real_name in self._users_by_name():
+            total, good, percent_good = counts.get(user_id, (0, 0, 0))
+            stats.append(
+                {
+                    "user_id": user_id,
+                    "name": real_name,
+                    "checkins": total,
+                    "good_checkins": good,
+                    "good_percentage": percent_good,
+                }
+            )
         return {
             "start": start.isoformat(),
             "end": end.isoformat(),
             "stats": stats,
         }
 
+    def _users_by_name(self) -> List[tuple[str, Optional[str]]]:
+        if self._sorted_users is None or self._sorted_users[0] != self._roster_version:
+            # get_users() already orders by real_name; caching it per roster
+            # version keeps that sort off the per-request path.
+            users = [(row["id"], row["real_name"]) for row in self.database.get_users()]
+            self._sorted_users = (self._roster_version, users)
+        return self._sorted_users[1]
+
     def get_monthly_summary(self, day: date) -> Dict[str, Any]:
-        start = day.replace(day=1)
-        next_month = (start + timedelta(days=32)).replace(day=1)
-        end = next_month - timedelta(days=1)
+        start, end = period_bounds("month", day)
         summary = self.database.get_monthly_trend(start, end)
         return summary
 
     # endregion
 
 
+def next_sync_delay(interval: float, failures: int) -> float:
+    """Return the jittered wait before the next periodic sync attempt."""
+
+    if failures:
+        delay = min(SYNC_RETRY_BASE_SECONDS * 2 ** (failures - 1), SYNC_RETRY_MAX_SECONDS)
+    else:
+        delay = interval
+    return delay * (1 + random.random() * SYNC_JITTER)
+
+
+async def run_periodic_sync(sync: Callable[[], Awaitable[None]], interval: float) -> None:
+    """Run ``sync`` forever, backing off exponentially while it keeps failing.
+
+    Each attempt is shielded so cancelling the loop (e.g. on shutdown) lets an
+    in-flight sync finish its writes instead of stopping between them.
+    """
+
+    failures = 0
+    while True:
+        try:
+            await asyncio.shield(sync())
+            failures = 0
+        except asyncio.CancelledError:
+            raise
+        except Exception:  # noqa: BLE001
+            failures += 1
+            logger.exception("Slack sync failed (attempt %s)", failures)
+        await asyncio.sleep(next_sync_delay(interval, failures))
+
+
 def load_roster_csv(path: Path) -> Iterable[User]:
     with path.open(newline="", encoding="utf-8") as handle:
         reader = csv.DictReader(handle)
@@ -176,10 +326,49 @@ def load_roster_csv(path: Path) -> Iterable[User]:
             )
 
 
+def parse_day(value: str) -> date:
+    """Parse a ``YYYY-MM-DD`` string with the C ``fromisoformat`` instead of ``strptime``."""
+
+    # fromisoformat also accepts compact and ISO week forms; only allow the
+    # dashed calendar form the API documents.
+    if len(value) != 10 or value[4] != "-" or value[7] != "-":
+        raise ValueError(f"Invalid date {value!r}; expected YYYY-MM-DD")
+    return date.fromisoformat(value)
+
+
+def period_bounds(period: str, day: date) -> tuple[date, date]:
+    """Return the first and last day of the ``day``/``week``/``month`` containing ``day``."""
+
+    if period == "day":
+        return day, day
+    if period == "week":
+        start = day - timedelta(days=day.weekday())
+        return start, start + timedelta(days=6)
+    if period == "month":
+        start = day.replace(day=1)
+        next_month = (start + timedelta(days=32)).replace(day=1)
+        return start, next_month - timedelta(days=1)
+    raise ValueError("period must be one of: day, week, month")
+
+
+def _is_sealed(day: date, today: date) -> bool:
+    return day < today - timedelta(days=1)
+
+
+@functools.lru_cache(maxsize=64)
 def day_bounds(day: date) -> tuple[str, str]:
-    start_dt = datetime.combine(day, time.min, tzinfo=timezone.utc)
-    end_dt = datetime.combine(day + timedelta(days=1), time.min, tzinfo=timezone.utc)
-    return f"{start_dt.timestamp():.6f}", f"{end_dt.timestamp():.6f}"
+    # UTC midnight as whole seconds since the epoch, formatted like Slack's ts.
+    start = (day.toordinal() - _EPOCH_ORDINAL) * SECONDS_PER_DAY
+    return f"{start}.000000", f"{start + SECONDS_PER_DAY}.000000"
 
 
-__all__ = ["SlackPulseService", "load_roster_csv", "day_bounds"]
+__all__ = [
+    "PERIODIC_SYNC_DAYS",
+    "SlackPulseService",
+    "load_roster_csv",
+    "next_sync_delay",
+    "parse_day",
+    "period_bounds",
+    "day_bounds",
+    "run_periodic_sync",
+]
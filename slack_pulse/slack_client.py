@@ -7,8 +7,15 @@ from collections.abc import AsyncIterator
 from typing import Any, Dict, Optional
 
 import httpx
+import orjson
 
 SLACK_API_BASE = "https://slack.com/api"
+# Caps concurrent requests when several days are synced at once.
+MAX_CONNECTIONS = 10
+# Used when a 429 response omits or garbles its Retry-After header.
+DEFAULT_RETRY_AFTER_SECONDS = 1.0
+# Rate-limited requests are retried this many times before giving up.
+MAX_RATE_LIMIT_RETRIES = 5
 
 
 class SlackApiError(RuntimeError):
@@ -31,15 +38,31 @@ class SlackClient:
                 "Content-Type": "application/x-www-form-urlencoded",
             },
             timeout=timeout,
+            limits=httpx.Limits(max_connections=MAX_CONNECTIONS),
         )
 
     async def close(self) -> None:
         await self._client.aclose()
 
+    async def _get(self, method: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """GET a Web API method, waiting out rate limits as Slack asks."""
+
+        for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+            response = await self._client.get(method, params=params)
+            if response.status_code != 429:
+                return orjson.loads(response.content)
+            if attempt == MAX_RATE_LIMIT_RETRIES:
+                break
+            try:
+                retry_after = float(response.headers.get("Retry-After", DEFAULT_RETRY_AFTER_SECONDS))
+            except ValueError:
+                retry_after = DEFAULT_RETRY_AFTER_SECONDS
+            await asyncio.sleep(retry_after)
+        raise SlackApiError(method, "ratelimited")
+
     async def fetch_users(self) -> list[dict[str, Any]]:
         method = "users.list"
-        response = await self._client.get(method)
-        data = response.json()
+        data = await self._get(method)
         if not data.get("ok"):
             raise SlackApiError(method, data.get("error", "unknown_error"))
         return [member for member in data.get("members", []) if not member.get("deleted")]
@@ -64,8 +87,7 @@ class SlackClient:
             if latest:
                 params["latest"] = latest
 
-            response = await self._client.get("conversations.history", params=params)
-            data = response.json()
+            data = await self._get("conversations.history", params)
             if not data.get("ok"):
                 raise SlackApiError("conversations.history", data.get("error", "unknown_error"))
 
@@ -80,7 +102,6 @@ class SlackClient:
             cursor = data.get("response_metadata", {}).get("next_cursor")
             if not cursor:
                 break
-            await asyncio.sleep(0.2)
 
 
 __all__ = ["SlackClient", "SlackApiError"]
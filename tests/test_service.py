@@ -0,0 +1,83 @@
+"""Tests for syncing days that were never synced before they are read."""
+
+from __future__ import annotations
+
+import asyncio
+import importlib
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+pytest.importorskip("dotenv")
+pytest.importorskip("httpx")
+pytest.importorskip("orjson")
+
+from slack_pulse.config import Settings  # noqa: E402
+from slack_pulse.db import Database  # noqa: E402
+from slack_pulse.service import SlackPulseService, day_bounds  # noqa: E402
+
+HISTORICAL_DAY = datetime.now(timezone.utc).date() - timedelta(days=10)
+
+
+class FakeSlackClient:
+    """Serves a fixed roster and channel history instead of calling Slack."""
+
+    def __init__(self, messages: list[dict]) -> None:
+        self.messages = messages
+        self.history_calls = 0
+
+    async def fetch_users(self) -> list[dict]:
+        return [
+            {"id": "U1", "name": "alice", "profile": {"real_name": "Alice"}},
+            {"id": "U2", "name": "bob", "profile": {"real_name": "Bob"}},
+        ]
+
+    async def fetch_channel_history(self, channel_id, oldest=None, latest=None):
+        self.history_calls += 1
+        for message in self.messages:
+            yield message
+
+
+@pytest.fixture
+def service(tmp_path):
+    oldest_ts, _ = day_bounds(HISTORICAL_DAY)
+    client = FakeSlackClient(
+        [{"user": "U1", "ts": str(float(oldest_ts) + 60), "text": "- completed the report"}]
+    )
+    settings = Settings(
+        slack_bot_token="xoxb-test",
+        channel_id="C1",
+        api_key="test",
+        database_path=tmp_path / "pulse.db",
+        team_roster_path=tmp_path / "missing.csv",
+    )
+    database = Database(settings.database_path)
+    yield SlackPulseService(settings, database, client)
+    database.close()
+
+
+def test_never_synced_historical_day_needs_sync_until_synced(service):
+    assert service.needs_sync(HISTORICAL_DAY)
+
+    asyncio.run(service.sync_day(HISTORICAL_DAY))
+
+    assert not service.needs_sync(HISTORICAL_DAY)
+    assert service.get_user_checkin("U1", HISTORICAL_DAY)["content"] == "- completed the report"
+    assert [row["user_id"] for row in service.get_absentees(HISTORICAL_DAY)] == ["U2"]
+
+
+def test_mcp_tools_sync_never_synced_historical_day_on_read(service, monkeypatch):
+    pytest.importorskip("mcp")
+    monkeypatch.setenv("SLACK_BOT_TOKEN", "xoxb-test")
+    monkeypatch.setenv("CHANNEL_ID", "C1")
+    monkeypatch.setenv("API_KEY", "test")
+    mcp_server = importlib.import_module("slack_pulse.mcp_server")
+    monkeypatch.setattr(mcp_server, "_service", service)
+
+    result = asyncio.run(mcp_server.get_absentees(HISTORICAL_DAY.isoformat()))
+    assert [row["user_id"] for row in result["absentees"]] == ["U2"]
+
+    # The day is now sealed, so reading it again does not go back to Slack.
+    result = asyncio.run(mcp_server.get_user_checkin("U1", HISTORICAL_DAY.isoformat()))
+    assert result["checkin"]["user_id"] == "U1"
+    assert service.client.history_calls == 1